@@ -1,11 +1,94 @@
-kfrom flask import Flask, request, jsonify
-import subprocess
+from flask import Flask, Response, g, request, jsonify, url_for
+import hashlib
 import os
+import time
+
+import db
+import metrics
+import product_io
+import profiler
+import runners
+from cache import TTLCache
+from jobs import JobManager
+from scheduler import Scheduler, parse_trigger
 
 app = Flask(__name__)
 
+# Background jobs (scraper, eBay sync) run here, not in the request thread.
+# Import their entry functions now so a trigger doesn't pay for it.
+runners.preload()
+jobs = JobManager()
+
+# Run the jobs on a timer inside this process, instead of a separate
+# always-on worker. Only one scheduler must run, so this relies on
+# --workers=1 (see render.yaml); set SCHEDULER_ENABLED=0 to turn it off.
+# The scraper is off until walmart_scraper.py is deployed alongside the app;
+# set SCHEDULE_SCRAPER (e.g. "cron:0 */6 * * *") to turn it on.
+SCHEDULES = {
+    "scraper": os.environ.get("SCHEDULE_SCRAPER", "off"),
+    "update_products": os.environ.get("SCHEDULE_UPDATE_PRODUCTS", "interval:600"),
+}
+# Scheduled job types that also run once at boot. The free Render plan spins
+# the service down when idle and the schedule lives in memory, so every
+# wake-up starts with a sync rather than waiting a full interval
+SCHEDULE_RUN_ON_START = {name.strip() for name in os.environ.get(
+    "SCHEDULE_RUN_ON_START", "update_products").split(",") if name.strip()}
+scheduler = Scheduler(jobs)
+for job_type, spec in SCHEDULES.items():
+    trigger = parse_trigger(spec)
+    if trigger is not None:
+        scheduler.add(job_type, trigger, run_now=job_type in SCHEDULE_RUN_ON_START)
+if os.environ.get("SCHEDULER_ENABLED", "1") == "1":
+    scheduler.start()
+
+# Rendered GET /api/products pages; cleared whenever this app writes products
+product_cache = TTLCache(ttl=float(os.environ.get("PRODUCTS_CACHE_TTL", 30)))
+
+
+# --- Request instrumentation ---
+slow_request_profiler = profiler.from_env()
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc()
+    if slow_request_profiler is not None:
+        slow_request_profiler.begin()
+
+
+@app.after_request
+def _record_status(response):
+    g.response_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _record_request(exc):
+    started = g.pop("request_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    # Label by route pattern, not the raw path, so job ids etc. don't
+    # create a new series each
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    status = g.pop("response_status", 500)
+    metrics.HTTP_IN_FLIGHT.dec()
+    metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+    metrics.HTTP_REQUEST_SECONDS.observe(duration, method=request.method, route=route)
+    if slow_request_profiler is not None:
+        slow_request_profiler.end(f"{request.method} {request.path}", duration)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, job and sync metrics in Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
 # --- Health check route ---
 @app.route('/')
+@app.route('/healthz')
 def home():
     return jsonify({
         "status": "ok",
@@ -13,28 +96,28 @@ def home():
     }), 200
 
 
+def _job_accepted(job_type):
+    job, created = jobs.submit(job_type)
+    response = jsonify({
+        "status": "accepted",
+        "job_id": job["id"],
+        "job_status": job["status"],
+        "coalesced": not created,
+        "status_url": url_for('get_job', job_id=job["id"]),
+    })
+    response.headers["Location"] = url_for('get_job', job_id=job["id"])
+    return response, 202
+
+
 # --- Example: Run your scraper manually ---
 @app.route('/run-scraper', methods=['POST'])
 def run_scraper():
     """
     Trigger your scraping script manually or from ScraperOps.
     Example: POST https://your-app.onrender.com/run-scraper
+    Returns 202 with a job id right away; poll GET /jobs/<id> for the result.
     """
-    try:
-        # Call your Python scraper file, e.g., walmart_scraper.py
-        result = subprocess.run(
-            ["python3", "walmart_scraper.py"],
-            capture_output=True, text=True, check=True
-        )
-        return jsonify({
-            "status": "success",
-            "output": result.stdout
-        }), 200
-    except subprocess.CalledProcessError as e:
-        return jsonify({
-            "status": "error",
-            "error": e.stderr
-        }), 500
+    return _job_accepted("scraper")
 
 
 # --- Example: Update eBay listings ---
@@ -42,25 +125,237 @@ def run_scraper():
 def update_products():
     """
     Run your sync script to update eBay prices/inventory.
+    Returns 202 with a job id right away; poll GET /jobs/<id> for the result.
     """
-    try:
-        result = subprocess.run(
-            ["python3", "update_products.py"],
-            capture_output=True, text=True, check=True
-        )
+    return _job_accepted("update_products")
+
+
+# --- Job status ---
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """
+    List recent jobs, newest first. Optional ?type=scraper|update_products.
+    Output is left out here; fetch a single job to see it.
+    """
+    job_list = jobs.list(job_type=request.args.get("type"))
+    for job in job_list:
+        job.pop("output")
+        job.pop("error")
+    return jsonify({"status": "success", "jobs": job_list}), 200
+
+
+@app.route('/schedule', methods=['GET'])
+def get_schedule():
+    """
+    When each scheduled job runs next, and how its last run went.
+    """
+    return jsonify({
+        "status": "success",
+        "running": scheduler.running,
+        "schedule": scheduler.status(),
+    }), 200
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    One job with its output. A job still running after JOB_TIMEOUT shows
+    as timed_out; for in-process jobs the "note" field explains that its
+    thread can't be stopped, and new runs of its type return this job
+    until that thread returns.
+    """
+    job = jobs.get(job_id)
+    if job is None:
         return jsonify({
-            "status": "success",
-            "output": result.stdout
-        }), 200
-    except subprocess.CalledProcessError as e:
+            "status": "error",
+            "error": f"Job {job_id} not found"
+        }), 404
+    return jsonify({"status": "success", "job": job}), 200
+
+
+# --- Products API ---
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+MAX_PAGE_SIZE = 1000
+
+
+def _query_number(name, cast):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+@app.route('/api/products', methods=['GET'])
+def list_products():
+    """
+    One page of products, ordered by id.
+    Query: after_id (start after this id), limit (default 100, max 1000),
+    fields (comma separated, from id,name,price,stock),
+    min_price/max_price, min_stock/max_stock.
+    Follow next_after_id for the next page. Pages carry an ETag, so a
+    poll with If-None-Match gets a 304 when nothing changed.
+    """
+    try:
+        after_id = _query_number("after_id", int)
+        limit = _query_number("limit", int)
+        filters = {
+            "min_price": _query_number("min_price", float),
+            "max_price": _query_number("max_price", float),
+            "min_stock": _query_number("min_stock", int),
+            "max_stock": _query_number("max_stock", int),
+        }
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    after_id = 0 if after_id is None else after_id
+    limit = 100 if limit is None else limit
+    if not 1 <= limit <= MAX_PAGE_SIZE:
         return jsonify({
             "status": "error",
-            "error": e.stderr
-        }), 500
+            "error": f"limit must be between 1 and {MAX_PAGE_SIZE}"
+        }), 400
+
+    fields = db.PRODUCT_FIELDS
+    if request.args.get("fields"):
+        fields = tuple(field.strip() for field in request.args["fields"].split(","))
+        unknown = [field for field in fields if field not in db.PRODUCT_FIELDS]
+        if unknown:
+            return jsonify({
+                "status": "error",
+                "error": f"Unknown fields: {', '.join(unknown)}"
+            }), 400
+
+    key = (after_id, limit, fields, tuple(sorted(filters.items())))
+    cached = product_cache.get(key)
+    if cached is None:
+        # Read before querying: if a write clears the cache meanwhile, this
+        # page may be stale and must not be stored
+        generation = product_cache.generation
+        conn = db.get_connection()
+        try:
+            products, next_after_id = db.list_products(
+                conn, after_id=after_id, limit=limit, fields=fields, **filters)
+        finally:
+            conn.close()
+        body = app.json.dumps({
+            "status": "success",
+            "products": products,
+            "next_after_id": next_after_id,
+        })
+        cached = (body, hashlib.sha1(body.encode()).hexdigest())
+        product_cache.set(key, cached, generation)
+
+    body, etag = cached
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+@app.route('/api/products', methods=['POST'])
+def add_product():
+    """
+    Add or update a single product by name. This is what update_products.py
+    calls when SYNC_BATCH_SIZE is 0.
+    """
+    try:
+        product = db.validate_product(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+
+    conn = db.get_connection()
+    try:
+        counts = db.upsert_products(conn, [product])
+    finally:
+        conn.close()
+    product_cache.clear()
+    return jsonify({"status": "success", **counts}), 201
+
+
+@app.route('/api/products/bulk', methods=['POST'])
+def bulk_products():
+    """
+    Add or update many products in one request and one transaction.
+    Body: a JSON list of {"name", "price", "stock"?} objects, or the same
+    objects one per line with Content-Type: application/x-ndjson.
+    {"products": [...], "delete": ["name", ...]} also removes products.
+    Responds with how many products were inserted, updated, unchanged
+    and deleted.
+    """
+    delete = []
+    if request.mimetype in NDJSON_MIMETYPES:
+        products = product_io.validate_records(product_io.iter_ndjson(request.stream))
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            delete = payload.get("delete") or []
+            payload = payload.get("products") or []
+        if not isinstance(payload, list):
+            return jsonify({
+                "status": "error",
+                "error": "Expected a JSON list of products"
+            }), 400
+        if not isinstance(delete, list) or not all(isinstance(name, str) for name in delete):
+            return jsonify({
+                "status": "error",
+                "error": "delete must be a list of product names"
+            }), 400
+        products = (db.validate_product(item) for item in payload)
+
+    conn = db.get_connection()
+    try:
+        counts = db.upsert_products(conn, products, delete=delete)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    finally:
+        conn.close()
+    product_cache.clear()
+    return jsonify({"status": "success", **counts}), 200
+
+
+@app.route('/api/products/export.ndjson', methods=['GET'])
+def export_products():
+    """
+    Stream every product as NDJSON, straight from a database cursor.
+    """
+    def generate():
+        conn = db.get_connection()
+        try:
+            yield from product_io.export_products(conn)
+        finally:
+            conn.close()
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+@app.route('/api/products/import', methods=['POST'])
+def import_products():
+    """
+    Load a large feed: the body is NDJSON or a JSON array, read as it
+    arrives and committed every ?chunk_size= products (default 1000).
+    Bad records are skipped and reported; ?strict=1 stops at the first one.
+    """
+    chunk_size = request.args.get("chunk_size", 1000, type=int)
+    strict = request.args.get("strict", "").lower() in ("1", "true", "yes")
+    if chunk_size < 1:
+        return jsonify({"status": "error", "error": "chunk_size must be at least 1"}), 400
+
+    conn = db.get_connection()
+    try:
+        summary = product_io.import_products(
+            conn, product_io.text_stream(request.stream),
+            chunk_size=chunk_size, strict=strict)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    finally:
+        conn.close()
+        product_cache.clear()  # earlier chunks are committed even on error
+    return jsonify({"status": "success", **summary}), 200
 
 
 # --- Run the app (for Render) ---
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 10000))  # Render assigns PORT dynamically
     app.run(host='0.0.0.0', port=port)
-
@@ -0,0 +1,120 @@
+"""
+Compare trigger-to-first-output latency of the two job runner modes:
+forking a new python3 per trigger vs calling the pre-imported entry
+function on a warm worker thread.
+
+    python benchmarks/bench_runners.py --runs 20
+
+Runs against a local stub of the dashboard API, so no network is needed.
+The database and sync snapshot live in a temp directory, and the snapshot
+is cleared before every run so each one pushes the full feed.
+"""
+import argparse
+import io
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import start_stub  # noqa: E402
+
+
+class FirstWriteBuffer(io.StringIO):
+    """StringIO that remembers when the first byte was written."""
+
+    first_write = None
+
+    def write(self, text):
+        if self.first_write is None and text:
+            self.first_write = time.perf_counter()
+        return super().write(text)
+
+
+def reset_snapshot(path):
+    """Forget what was pushed, so the next sync is a full one and not an empty delta."""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM sync_snapshot")
+    except sqlite3.OperationalError:
+        pass  # not created yet
+    finally:
+        conn.close()
+
+
+def time_subprocess(runner, env):
+    reset_snapshot(env["SYNC_STATE_PATH"])
+    start = time.perf_counter()
+    proc = subprocess.Popen(runner.command, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True, cwd=ROOT, env=env)
+    proc.stdout.readline()
+    first = time.perf_counter() - start
+    proc.communicate()
+    return first, time.perf_counter() - start
+
+
+def time_inprocess(runner, executor, state_path):
+    reset_snapshot(state_path)
+    buffer = FirstWriteBuffer()
+    start = time.perf_counter()
+    executor.submit(runner.run_inprocess, buffer).result()
+    return buffer.first_write - start, time.perf_counter() - start
+
+
+def summarize(samples):
+    firsts = sorted(first for first, _ in samples)
+    totals = sorted(total for _, total in samples)
+    return {
+        "runs": len(samples),
+        "first_output_median_ms": round(statistics.median(firsts) * 1000, 2),
+        "first_output_p95_ms": round(firsts[int(len(firsts) * 0.95) - 1] * 1000, 2),
+        "total_median_ms": round(statistics.median(totals) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--job", default="update_products")
+    args = parser.parse_args()
+
+    server, base_url = start_stub()
+    tmp = tempfile.TemporaryDirectory(prefix="bench-runners-")
+    state_path = os.path.join(tmp.name, "products.db")
+    # Must be set before the job module is imported. Keep the tracked
+    # products.db out of it.
+    os.environ["DASHBOARD_URL"] = base_url
+    os.environ["DATABASE_PATH"] = state_path
+    os.environ["SYNC_STATE_PATH"] = state_path
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+
+    import runners
+
+    runner = runners.RUNNERS[args.job]
+    if not runner.load():
+        sys.exit(f"Can't import {runner.module}.{runner.entry}: {runner.load_error}")
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit(lambda: None).result()       # warm the worker thread
+    time_inprocess(runner, executor, state_path)  # and the HTTP connection pool
+
+    results = {
+        "job": args.job,
+        "subprocess": summarize([time_subprocess(runner, env) for _ in range(args.runs)]),
+        "inprocess": summarize([time_inprocess(runner, executor, state_path) for _ in range(args.runs)]),
+    }
+    server.shutdown()
+    tmp.cleanup()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
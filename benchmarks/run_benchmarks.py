@@ -0,0 +1,381 @@
+"""
+Offline benchmark suite for the dashboard service.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick
+    python benchmarks/run_benchmarks.py --only health,bulk_write --sizes 1000,10000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<older>.json
+
+Measures:
+  health       /healthz latency, idle and while a sync job runs, with the app
+               under gunicorn using the worker/thread/timeout flags from
+               render.yaml (once per job runner mode)
+  sync         update_products throughput at each size, one product per
+               request and batched, plus a follow-up delta cycle
+  bulk_write   db.upsert_products into a fresh products.db: insert,
+               unchanged re-sync, and a 2% change
+  import       peak Python memory of product_io imports (NDJSON and JSON
+               array) next to a plain json.load of the same file
+
+Everything talks to benchmarks/stub_server.py instead of Render or eBay.
+Results go to benchmarks/results/<timestamp>-<commit>.json, which is
+git-ignored (they are machine-specific); --compare prints the change against
+an earlier results file.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import product_io  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+SUITES = ("health", "sync", "bulk_write", "import")
+# How long the health suite waits for its sync job before giving up on it
+DEFAULT_JOB_TIMEOUT = 300
+
+
+# --- Helpers ---
+def gunicorn_flags():
+    """The --workers/--threads/--timeout flags render.yaml starts us with."""
+    with open(os.path.join(ROOT, "render.yaml")) as fp:
+        flags = re.findall(r"--(workers|threads|timeout)=(\d+)", fp.read())
+    return [f"--{name}={value}" for name, value in flags]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+@contextlib.contextmanager
+def serve(command, ready_path, port, env=None):
+    proc = subprocess.Popen(command, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(base_url + ready_path)
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def stub_server(latency_ms=0):
+    port = free_port()
+    command = [sys.executable, os.path.join(BENCH_DIR, "stub_server.py"),
+               "--port", str(port), "--latency-ms", str(latency_ms)]
+    return serve(command, "/stats", port)
+
+
+def app_server(env):
+    port = free_port()
+    command = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}", "app:app",
+               *gunicorn_flags(), "--log-level=warning"]
+    return serve(command, "/healthz", port, env=dict(os.environ, **env))
+
+
+def make_products(count, offset=0):
+    return [{"name": f"sku-{i:07d}", "price": round(1 + (i + offset) % 5000 / 100, 2), "stock": i % 50}
+            for i in range(count)]
+
+
+def write_feed(path, count, fmt="ndjson"):
+    with open(path, "w", encoding="utf-8") as fp:
+        if fmt == "ndjson":
+            for product in make_products(count):
+                fp.write(json.dumps(product) + "\n")
+        else:
+            json.dump(make_products(count), fp)
+    return path
+
+
+def latency_summary(samples):
+    samples = sorted(samples)
+
+    def pct(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3)
+
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+# --- Suites ---
+def bench_health(tmp, sizes, stub_latency_ms, job_timeout=DEFAULT_JOB_TIMEOUT):
+    """
+    /healthz latency idle and while an update_products job runs. A job that
+    outlives job_timeout, or a probe that errors, is recorded as a failure.
+    """
+    feed_size = min(max(sizes), 10000)
+    feed = write_feed(os.path.join(tmp, "health-feed.ndjson"), feed_size)
+    results = {"gunicorn_flags": gunicorn_flags(), "feed_size": feed_size}
+
+    with stub_server(latency_ms=max(stub_latency_ms, 1)) as stub_url:
+        for mode in ("inprocess", "subprocess"):
+            env = {
+                "DATABASE_PATH": os.path.join(tmp, f"health-{mode}.db"),
+                "SYNC_STATE_PATH": os.path.join(tmp, f"health-state-{mode}.db"),
+                "SYNC_FEED_PATH": feed,
+                "DASHBOARD_URL": stub_url,
+                "JOB_RUNNER_MODE": mode,
+                "SCHEDULER_ENABLED": "0",
+            }
+            with app_server(env) as base_url:
+                session = requests.Session()
+
+                def probe():
+                    started = time.perf_counter()
+                    session.get(base_url + "/healthz", timeout=30).raise_for_status()
+                    return time.perf_counter() - started
+
+                idle = [probe() for _ in range(200)]
+
+                job_id = session.post(base_url + "/update-products", timeout=30).json()["job_id"]
+                deadline = time.monotonic() + job_timeout
+                busy, job, failure = [], None, None
+                try:
+                    while True:
+                        busy.append(probe())
+                        if len(busy) % 20 == 0:
+                            job = session.get(f"{base_url}/jobs/{job_id}", timeout=30).json()["job"]
+                            if job["status"] not in ("queued", "running"):
+                                break
+                        if time.monotonic() > deadline:
+                            job = session.get(f"{base_url}/jobs/{job_id}", timeout=30).json()["job"]
+                            failure = f"job still {job['status']} after {job_timeout:g}s"
+                            break
+                        time.sleep(0.005)
+                except requests.RequestException as e:
+                    failure = f"probe failed: {e}"
+                if job is not None and job["status"] != "succeeded" and failure is None:
+                    failure = f"job {job['status']}: {job.get('error')}"
+
+            if failure:
+                print(f"  health ({mode}) failed: {failure}", flush=True)
+            results[mode] = {
+                "idle": latency_summary(idle),
+                "during_job": latency_summary(busy) if busy else None,
+                "job_status": job["status"] if job else None,
+                "job_seconds": job["duration"] if job else None,
+                "failure": failure,
+            }
+    return results
+
+
+def bench_sync(tmp, sizes, stub_latency_ms):
+    """update_products throughput against the stub API."""
+    import update_products as up
+
+    results = {}
+    with stub_server(latency_ms=stub_latency_ms) as stub_url:
+        up.API_URL = stub_url + "/api/products"
+        up.BULK_API_URL = up.API_URL + "/bulk"
+        for label, batch_size in (("per_product", 0), ("batch_500", 500)):
+            up.SYNC_BATCH_SIZE = batch_size
+            results[label] = {}
+            for count in sizes:
+                up.SYNC_STATE_PATH = os.path.join(tmp, f"sync-{label}-{count}.db")
+                feed = make_products(count)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    first = up.update_products(feed)
+                    # Next cycle: 2% of products changed
+                    for product in feed[::50]:
+                        product["price"] += 1
+                    delta = up.update_products(feed)
+                results[label][str(count)] = {
+                    "full_seconds": first["seconds"],
+                    "full_products_per_second": first["per_second"],
+                    "full_failed": first["failed"],
+                    "delta_pushed": delta["pushed"],
+                    "delta_seconds": delta["seconds"],
+                }
+    return results
+
+
+def bench_bulk_write(tmp, sizes):
+    """db.upsert_products speed into a fresh products.db."""
+    results = {}
+    for count in sizes:
+        conn = db.get_connection(os.path.join(tmp, f"bulk-{count}.db"))
+        products = make_products(count)
+        timings = {}
+        for step in ("insert", "unchanged", "change_2pct"):
+            if step == "change_2pct":
+                for product in products[::50]:
+                    product["price"] += 1
+            started = time.perf_counter()
+            counts = db.upsert_products(conn, products)
+            elapsed = time.perf_counter() - started
+            timings[step] = {
+                "seconds": round(elapsed, 4),
+                "rows_per_second": round(count / elapsed),
+                **counts,
+            }
+        conn.close()
+        results[str(count)] = timings
+    return results
+
+
+def bench_import(tmp, sizes):
+    """Peak Python memory of streaming imports vs loading the whole file."""
+    results = {}
+    for count in sizes:
+        results[str(count)] = {}
+        for fmt in ("ndjson", "json"):
+            path = write_feed(os.path.join(tmp, f"import-{count}.{fmt}"), count, fmt)
+            conn = db.get_connection(os.path.join(tmp, f"import-{count}-{fmt}.db"))
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            with open(path, encoding="utf-8") as fp:
+                summary = product_io.import_products(conn, fp)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            conn.close()
+
+            tracemalloc.start()
+            with open(path, encoding="utf-8") as fp:
+                if fmt == "json":
+                    json.load(fp)
+                else:
+                    [json.loads(line) for line in fp]
+            naive_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results[str(count)][fmt] = {
+                "file_bytes": os.path.getsize(path),
+                "seconds": round(elapsed, 3),
+                "peak_bytes": peak,
+                "load_all_peak_bytes": naive_peak,
+                "inserted": summary["inserted"],
+            }
+    return results
+
+
+# --- Results ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(data, prefix=""):
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def compare(old, new):
+    old_values = dict(flatten(old.get("results", {})))
+    print(f"Compared with {old.get('commit', '?')} ({old.get('timestamp', '?')}):")
+    for path, value in flatten(new["results"]):
+        before = old_values.get(path)
+        if before in (None, 0):
+            continue
+        change = 100.0 * (value - before) / before
+        if abs(change) >= 1:
+            print(f"  {path}: {before} -> {value} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the dashboard service.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated product counts (default: 1000,10000,100000)")
+    parser.add_argument("--quick", action="store_true", help="shorthand for --sizes 1000")
+    parser.add_argument("--only", help=f"comma-separated suites to run, from {','.join(SUITES)}")
+    parser.add_argument("--stub-latency-ms", type=float, default=0, help="delay the stub adds per POST")
+    parser.add_argument("--job-timeout", type=float, default=DEFAULT_JOB_TIMEOUT,
+                        help="seconds the health suite waits for its sync job (default: %(default)s)")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    sizes = [1000] if args.quick else [int(size) for size in args.sizes.split(",")]
+    suites = args.only.split(",") if args.only else list(SUITES)
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    commit = git_commit()
+    timestamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    report = {
+        "commit": commit,
+        "timestamp": timestamp,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "stub_latency_ms": args.stub_latency_ms,
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="dashboard-bench-") as tmp:
+        for suite in suites:
+            print(f"Running {suite}...", flush=True)
+            started = time.perf_counter()
+            if suite == "health":
+                report["results"][suite] = bench_health(tmp, sizes, args.stub_latency_ms, args.job_timeout)
+            elif suite == "sync":
+                report["results"][suite] = bench_sync(tmp, sizes, args.stub_latency_ms)
+            elif suite == "bulk_write":
+                report["results"][suite] = bench_bulk_write(tmp, sizes)
+            else:
+                report["results"][suite] = bench_import(tmp, sizes)
+            print(f"  done in {time.perf_counter() - started:.1f}s", flush=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{timestamp}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fp:
+        json.dump(report, fp, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"Wrote {output}")
+
+    if args.compare:
+        with open(args.compare) as fp:
+            compare(json.load(fp), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Tiny local stand-in for the dashboard API on Render and the eBay API, so
+benchmarks run offline.
+
+    python benchmarks/stub_server.py --port 8900 --latency-ms 5
+
+Point DASHBOARD_URL (and any eBay base URL) at it. GET /stats returns how
+many requests and products it has received.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Render
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, products=0):
+        stats = self.server.stats
+        with self.server.stats_lock:
+            stats["requests"] += 1
+            stats["products"] += products
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.stats_lock:
+                self._send(200, dict(self.server.stats))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        path = self.path.split("?", 1)[0].rstrip("/")
+
+        # --- dashboard API ---
+        if path == "/api/products":
+            self._count(1)
+            self._send(201, {"message": "ok"})
+        elif path == "/api/products/bulk":
+            body = json.loads(raw or b"null")
+            products = body.get("products", []) if isinstance(body, dict) else body
+            self._count(len(products or []))
+            self._send(200, {"status": "success", "inserted": len(products or [])})
+
+        # --- eBay API ---
+        elif path == "/identity/v1/oauth2/token":
+            self._count()
+            self._send(200, {"access_token": "stub-access-token", "expires_in": 7200,
+                             "token_type": "User Access Token"})
+        elif path == "/sell/inventory/v1/bulk_update_price_quantity":
+            requests = json.loads(raw or b"{}").get("requests", [])
+            self._count(len(requests))
+            self._send(200, {"responses": [{"sku": item.get("sku"), "statusCode": 200}
+                                           for item in requests]})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+
+def make_server(host="127.0.0.1", port=0, latency_ms=0):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000.0
+    server.stats = {"requests": 0, "products": 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def start_stub(host="127.0.0.1", port=0, latency_ms=0):
+    """Start the stub on a background thread. Returns (server, base_url)."""
+    server = make_server(host, port, latency_ms)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the dashboard and eBay APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0, help="added delay per POST")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms)
+    print(f"Stub API listening on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache. Entries expire after ttl seconds,
+    and the least recently used entry is dropped past max_entries.
+
+    clear() bumps `generation`. A reader that computes a value from the
+    database should read the generation first and pass it to set(), so a
+    value computed before a concurrent write and clear() is not stored.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, generation=None):
+        """Store value, unless the cache was cleared since `generation` was read."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
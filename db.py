@@ -0,0 +1,168 @@
+import math
+import os
+import sqlite3
+
+DATABASE_PATH = os.environ.get(
+    "DATABASE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "products.db"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product (
+    id INTEGER NOT NULL,
+    name VARCHAR(120) NOT NULL,
+    price FLOAT NOT NULL,
+    stock INTEGER,
+    PRIMARY KEY (id)
+)
+"""
+
+
+# Schema changes, applied in order and tracked with PRAGMA user_version.
+# Append new steps; never edit one that has shipped.
+MIGRATIONS = [
+    # 1: names are how the updater identifies products, so make them unique.
+    # Older databases may hold duplicates; keep the newest row of each.
+    """
+    DELETE FROM product WHERE id NOT IN (SELECT MAX(id) FROM product GROUP BY name);
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_product_name ON product (name);
+    """,
+    # 2: what update_products.py last pushed, so it can send only changes
+    """
+    CREATE TABLE IF NOT EXISTS sync_snapshot (
+        name TEXT PRIMARY KEY,
+        hash TEXT NOT NULL,
+        pushed_at REAL NOT NULL
+    );
+    """,
+]
+
+_migrated = set()
+
+
+def migrate(conn):
+    """Bring the database up to the latest schema version."""
+    conn.execute(SCHEMA)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.executescript(f"BEGIN; {script} PRAGMA user_version = {number}; COMMIT;")
+        print(f"Migrated products database to schema version {number}")
+
+
+def get_connection(path=None):
+    path = path or DATABASE_PATH
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if path not in _migrated:
+        migrate(conn)
+        _migrated.add(path)
+    return conn
+
+
+def validate_product(data):
+    """
+    Check one incoming product and return a clean dict with name, price and
+    stock (None when not given). Raises ValueError on bad input.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("product must be a JSON object")
+
+    name = data.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("name is required")
+    if len(name) > 120:
+        raise ValueError("name is longer than 120 characters")
+
+    price = data.get("price")
+    # json accepts NaN and Infinity; neither can be stored or sent back out
+    if (isinstance(price, bool) or not isinstance(price, (int, float))
+            or not math.isfinite(price) or price < 0):
+        raise ValueError(f"invalid price for {name!r}")
+
+    stock = data.get("stock")
+    if stock is not None and (isinstance(stock, bool) or not isinstance(stock, int) or stock < 0):
+        raise ValueError(f"invalid stock for {name!r}")
+
+    return {"name": name.strip(), "price": float(price), "stock": stock}
+
+
+def upsert_products(conn, products, delete=()):
+    """
+    Add or update products by name in a single transaction. products can be
+    any iterable (e.g. a generator over an NDJSON stream); if it raises
+    part way through, nothing is written. A missing stock keeps the stored
+    value, and a name given twice keeps its last entry. Names in delete are
+    removed in the same transaction.
+    Returns a dict with inserted, updated, unchanged and deleted counts.
+    """
+    with conn:
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS product_staging ("
+            "name TEXT PRIMARY KEY, price FLOAT NOT NULL, stock INTEGER)"
+        )
+        conn.execute("DELETE FROM product_staging")
+        conn.executemany(
+            "INSERT OR REPLACE INTO product_staging (name, price, stock) VALUES (?, ?, ?)",
+            ((p["name"], p["price"], p["stock"]) for p in products),
+        )
+
+        total, inserted, updated = conn.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(p.id IS NULL), 0),
+                   COALESCE(SUM(p.id IS NOT NULL AND (
+                       p.price IS NOT s.price
+                       OR p.stock IS NOT COALESCE(s.stock, p.stock))), 0)
+            FROM product_staging s LEFT JOIN product p ON p.name = s.name
+        """).fetchone()
+
+        # "WHERE true" is needed for SQLite to parse the upsert clause after a SELECT
+        conn.execute("""
+            INSERT INTO product (name, price, stock)
+            SELECT name, price, stock FROM product_staging WHERE true
+            ON CONFLICT (name) DO UPDATE SET
+                price = excluded.price,
+                stock = COALESCE(excluded.stock, product.stock)
+            WHERE product.price IS NOT excluded.price
+               OR product.stock IS NOT COALESCE(excluded.stock, product.stock)
+        """)
+        conn.execute("DELETE FROM product_staging")
+
+        deleted = 0
+        for name in delete:
+            deleted += conn.execute("DELETE FROM product WHERE name = ?", (name,)).rowcount
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": total - inserted - updated,
+        "deleted": deleted,
+    }
+
+
+PRODUCT_FIELDS = ("id", "name", "price", "stock")
+
+
+def list_products(conn, after_id=0, limit=100, fields=PRODUCT_FIELDS,
+                  min_price=None, max_price=None, min_stock=None, max_stock=None):
+    """
+    One page of products ordered by id, starting after after_id (keyset
+    pagination, so deep pages cost the same as the first). Returns
+    (rows as dicts with only the requested fields, next after_id or None).
+    """
+    where, params = ["id > ?"], [after_id]
+    for clause, value in (("price >= ?", min_price), ("price <= ?", max_price),
+                          ("stock >= ?", min_stock), ("stock <= ?", max_stock)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+
+    # Always select id so we know where the next page starts
+    columns = ["id"] + [field for field in fields if field != "id"]
+    rows = conn.execute(
+        f"SELECT {', '.join(columns)} FROM product WHERE {' AND '.join(where)} "
+        "ORDER BY id LIMIT ?",
+        params + [limit + 1],
+    ).fetchall()
+
+    next_after_id = rows[limit - 1]["id"] if len(rows) > limit else None
+    return [{field: row[field] for field in fields} for row in rows[:limit]], next_after_id
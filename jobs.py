@@ -0,0 +1,193 @@
+import os
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from runners import RUNNERS
+
+# How many jobs may run at the same time (kept small: we share one dyno)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+# Hard limit for a single job run, in seconds. Subprocess runs are killed;
+# in-process runs can't be, so they are marked timed_out but keep their
+# type blocked until their thread returns
+JOB_TIMEOUT = int(os.environ.get("JOB_TIMEOUT", 1800))
+# How many finished jobs to remember for GET /jobs
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", 50))
+# Only keep the tail of stdout/stderr so a chatty job can't eat our memory
+JOB_OUTPUT_LIMIT = int(os.environ.get("JOB_OUTPUT_LIMIT", 64 * 1024))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+TIMED_OUT_NOTE = (
+    "In-process jobs can't be stopped: this job's thread may still be running "
+    "and holding a job worker. New runs of this type return this job until "
+    "its thread returns."
+)
+
+
+def _tail(text, limit=JOB_OUTPUT_LIMIT):
+    if not text:
+        return ""
+    return text[-limit:]
+
+
+class JobManager:
+    """
+    Runs jobs on a small background thread pool instead of inside the
+    request thread. Triggering a job type that is already queued or running
+    returns the existing job instead of starting a second copy. A job still
+    running after `timeout` seconds is marked timed_out, but only stops
+    blocking new runs of its type once it has actually returned.
+    """
+
+    def __init__(self, runners=None, max_workers=JOB_WORKERS,
+                 timeout=JOB_TIMEOUT, history=JOB_HISTORY):
+        self.runners = runners if runners is not None else RUNNERS
+        self.timeout = timeout
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # job id -> job record, oldest first
+        self._active = {}           # job type -> id of its queued/running job
+
+    def submit(self, job_type):
+        """
+        Queue a job of the given type. Returns (job, created) where created
+        is False when an existing queued/running job was reused.
+        """
+        if job_type not in self.runners:
+            raise KeyError(job_type)
+
+        with self._lock:
+            self._expire_overdue()
+            active_id = self._active.get(job_type)
+            if active_id is not None:
+                return dict(self._jobs[active_id]), False
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "type": job_type,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "duration": None,
+                "mode": None,
+                "returncode": None,
+                "output": "",
+                "error": "",
+                "note": None,
+            }
+            self._jobs[job["id"]] = job
+            self._active[job_type] = job["id"]
+            self._prune()
+            metrics.JOBS_ACTIVE.inc(job_type=job_type)
+            snapshot = dict(job)
+
+        self._executor.submit(self._run, job["id"])
+        return snapshot, True
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire_overdue()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self, job_type=None):
+        """Return all known jobs, newest first."""
+        with self._lock:
+            self._expire_overdue()
+            jobs = [dict(job) for job in reversed(self._jobs.values())]
+        if job_type is not None:
+            jobs = [job for job in jobs if job["type"] == job_type]
+        return jobs
+
+    def _update(self, job_id, **fields):
+        """
+        Update a job record; a finished job frees its type for new runs.
+        A job already marked timed_out keeps its status and error. Returns
+        a copy of the updated record, or None if the job is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "timed_out":
+                fields.pop("status", None)
+                fields.pop("error", None)
+            job.update(fields)
+            if job["status"] not in ACTIVE_STATUSES and job["finished_at"] is not None:
+                if self._active.get(job["type"]) == job_id:
+                    del self._active[job["type"]]
+            return dict(job)
+
+    def _expire_overdue(self):
+        # Mark running jobs past the timeout as timed_out. They keep their
+        # slot in _active until _run returns, so a run is never overlapped;
+        # _run records their metrics then. Caller holds the lock.
+        now = time.time()
+        for job_id in self._active.values():
+            job = self._jobs[job_id]
+            if job["status"] != "running" or now - job["started_at"] <= self.timeout:
+                continue
+            job.update(status="timed_out", note=TIMED_OUT_NOTE,
+                       error=f"Job timed out after {self.timeout}s")
+
+    def _prune(self):
+        # Drop the oldest finished jobs once we go over the history limit.
+        # Queued/running jobs (including timed_out ones whose thread hasn't
+        # returned) are never dropped. Caller holds the lock.
+        active = set(self._active.values())
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job["status"] not in ACTIVE_STATUSES and job_id not in active]
+        for job_id in finished[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job_id]
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        started = time.time()
+        self._update(job_id, status="running", started_at=started)
+
+        fields = {}
+        try:
+            result = self.runners[job["type"]].run(timeout=self.timeout)
+            fields = {
+                "status": "succeeded" if result["returncode"] == 0 else "failed",
+                "mode": result["mode"],
+                "returncode": result["returncode"],
+                "output": _tail(result["output"]),
+                "error": _tail(result["error"]),
+            }
+        except subprocess.TimeoutExpired as e:
+            fields = {
+                "status": "timed_out",
+                "mode": "subprocess",
+                "output": _tail(e.stdout.decode() if isinstance(e.stdout, bytes) else e.stdout),
+                "error": f"Job timed out after {self.timeout}s",
+            }
+        except Exception as e:
+            fields = {"status": "failed", "error": str(e)}
+        finally:
+            finished = time.time()
+            fields.setdefault("status", "failed")
+            record = self._update(job_id, finished_at=finished,
+                                  duration=round(finished - started, 3), **fields)
+            if record is not None:
+                fields["status"] = record["status"]  # a job that timed out stays timed_out
+            self._record_metrics(job["type"], finished - started, fields)
+
+    @staticmethod
+    def _record_metrics(job_type, duration, fields):
+        returncode = fields.get("returncode")
+        output_size = sum(len((fields.get(key) or "").encode()) for key in ("output", "error"))
+        metrics.JOBS_ACTIVE.dec(job_type=job_type)
+        metrics.JOB_RUNS.inc(job_type=job_type, status=fields["status"],
+                             mode=fields.get("mode") or "unknown")
+        metrics.JOB_SECONDS.observe(duration, job_type=job_type)
+        metrics.JOB_LAST_EXIT_CODE.set(-1 if returncode is None else returncode, job_type=job_type)
+        metrics.JOB_OUTPUT_BYTES.observe(output_size, job_type=job_type)
@@ -0,0 +1,164 @@
+"""
+In-process metrics, served in Prometheus text format at GET /metrics.
+
+Kept dependency-free on purpose: a handful of counters, gauges and
+histograms is all we need, and they are cheap enough to update on every
+request. Metrics recorded by a job that runs as a subprocess stay in that
+subprocess and are lost; run jobs in-process (the default) to see them.
+"""
+import math
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+            lines += self._render_samples(items)
+        return lines
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def _render_samples(self, items):
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, extra=[("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- HTTP requests (app.py hooks) ---
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being handled right now."))
+
+# --- Background jobs (jobs.py) ---
+JOB_RUNS = REGISTRY.register(Counter(
+    "job_runs_total", "Finished job runs.", ("job_type", "status", "mode")))
+JOB_SECONDS = REGISTRY.register(Histogram(
+    "job_duration_seconds", "Job run time.", ("job_type",)))
+JOB_LAST_EXIT_CODE = REGISTRY.register(Gauge(
+    "job_last_exit_code", "Exit code of the latest run (-1 if it never finished).", ("job_type",)))
+JOB_OUTPUT_BYTES = REGISTRY.register(Histogram(
+    "job_output_bytes", "Size of a run's captured stdout + stderr.", ("job_type",), buckets=SIZE_BUCKETS))
+JOBS_ACTIVE = REGISTRY.register(Gauge(
+    "jobs_active", "Jobs queued or running.", ("job_type",)))
+
+# --- Product sync (update_products.py) ---
+SYNC_CYCLE_SECONDS = REGISTRY.register(Histogram(
+    "sync_cycle_duration_seconds", "Time for one product sync cycle."))
+SYNC_PRODUCTS = REGISTRY.register(Counter(
+    "sync_products_total", "Products handled by the sync, by outcome.", ("result",)))
+SYNC_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "sync_request_duration_seconds", "Latency of each call to the products API.", ("kind", "outcome")))
@@ -0,0 +1,226 @@
+"""
+Streaming import/export of products between products.db and JSON files.
+
+    python product_io.py import data/products.json
+    python product_io.py import feed.ndjson --chunk-size 5000 --strict
+    python product_io.py export products.ndjson
+
+Imports accept a JSON array or NDJSON (one object per line), read a piece
+at a time, and commit every --chunk-size products. Exports write NDJSON
+straight from a database cursor. Memory use doesn't grow with file size.
+"""
+import argparse
+import io
+import json
+import re
+import sys
+from itertools import islice
+
+import db
+
+READ_SIZE = 64 * 1024
+# Keep only the first few rejects in the summary
+MAX_REPORTED_ERRORS = 20
+
+_WHITESPACE = re.compile(r"\s*")
+_VALUE_END = frozenset(" \t\r\n,]")
+
+
+def iter_ndjson(fp, first_line=1, on_error=None):
+    """
+    Yield (position, record) for each non-blank line. A line that isn't
+    valid JSON raises ValueError, or is passed to on_error(position, error)
+    and skipped when on_error is given. Lines may be str or bytes.
+    """
+    for number, line in enumerate(fp, start=first_line):
+        if not line.strip():
+            continue
+        try:
+            yield f"line {number}", json.loads(line)
+        except ValueError as e:
+            if on_error is None:
+                raise ValueError(f"line {number}: {e}")
+            on_error(f"line {number}", e)
+
+
+def iter_json_array(fp, buffer=""):
+    """
+    Yield (position, item) from a top-level JSON array without loading it
+    all. buffer is anything already read from fp after the opening "[".
+    """
+    decoder = json.JSONDecoder()
+    pos, index, eof = 0, 0, False
+    need_comma = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fp.read(READ_SIZE)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("unexpected end of JSON array")
+            fill()
+            continue
+
+        char = buffer[pos]
+        if char == "]" and (need_comma or not index):
+            return
+        if need_comma:
+            if char != ",":
+                raise ValueError(f"item {index + 1}: expected ',' or ']'")
+            pos += 1
+            need_comma = False
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            if eof:
+                raise ValueError(f"item {index + 1}: {e}")
+            fill()
+            continue
+        # A value must be followed by whitespace, "," or "]". Anything else
+        # (or nothing yet) means a number may have been cut mid-way by the
+        # read, e.g. "1." of "1.5", so read more and decode it again
+        if not eof and (end == len(buffer) or buffer[end] not in _VALUE_END):
+            fill()
+            continue
+
+        index += 1
+        pos = end
+        need_comma = True
+        yield f"item {index}", item
+
+
+def iter_records(fp, on_error=None):
+    """
+    Yield (position, record) from a text stream holding either a JSON
+    array or NDJSON, picked by the first non-blank character.
+    """
+    line = 1
+    while True:
+        char = fp.read(1)
+        if not char:
+            return
+        if char == "\n":
+            line += 1
+        elif not char.isspace():
+            break
+
+    if char == "[":
+        yield from iter_json_array(fp)
+    else:
+        first = char + fp.readline()
+        yield from iter_ndjson(_prepend(first, fp), first_line=line, on_error=on_error)
+
+
+def _prepend(first, fp):
+    yield first
+    yield from fp
+
+
+def validate_records(records, on_error=None):
+    """
+    Turn (position, record) pairs into clean products. Invalid records
+    raise ValueError, or go to on_error(position, error) when given.
+    """
+    for position, record in records:
+        try:
+            yield db.validate_product(record)
+        except ValueError as e:
+            if on_error is None:
+                raise ValueError(f"{position}: {e}")
+            on_error(position, e)
+
+
+def import_products(conn, fp, chunk_size=1000, strict=False):
+    """
+    Stream products from fp into the database, committing every chunk_size
+    products. Bad records are counted and skipped, unless strict, in which
+    case the first one raises ValueError (earlier chunks stay committed).
+    Returns totals plus the first few errors.
+    """
+    summary = {"inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0, "errors": []}
+
+    def reject(position, error):
+        summary["rejected"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append(f"{position}: {error}")
+
+    on_error = None if strict else reject
+    products = validate_records(iter_records(fp, on_error=on_error), on_error=on_error)
+    while True:
+        chunk = list(islice(products, chunk_size))
+        if not chunk:
+            break
+        counts = db.upsert_products(conn, chunk)
+        for key in ("inserted", "updated", "unchanged"):
+            summary[key] += counts[key]
+    return summary
+
+
+def export_products(conn, batch_size=1000):
+    """Yield NDJSON text, one batch of rows at a time, straight off a cursor."""
+    cursor = conn.execute("SELECT id, name, price, stock FROM product ORDER BY id")
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield "".join(json.dumps(dict(row)) + "\n" for row in rows)
+
+
+def text_stream(binary):
+    """Wrap a binary stream (e.g. a request body) for iter_records."""
+    if not isinstance(binary, io.BufferedIOBase):
+        binary = io.BufferedReader(binary)
+    return io.TextIOWrapper(binary, encoding="utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import/export products.db as JSON or NDJSON.")
+    parser.add_argument("--db", help="database path (default: DATABASE_PATH or products.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = commands.add_parser("import", help="load a JSON array or NDJSON file")
+    import_cmd.add_argument("path", help="file to read, or - for stdin")
+    import_cmd.add_argument("--chunk-size", type=int, default=1000, help="products per commit")
+    import_cmd.add_argument("--strict", action="store_true", help="stop at the first bad record")
+
+    export_cmd = commands.add_parser("export", help="write all products as NDJSON")
+    export_cmd.add_argument("path", nargs="?", default="-", help="file to write, or - for stdout")
+
+    args = parser.parse_args(argv)
+    conn = db.get_connection(args.db)
+    try:
+        if args.command == "import":
+            fp = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+            try:
+                summary = import_products(conn, fp, chunk_size=args.chunk_size, strict=args.strict)
+            finally:
+                if fp is not sys.stdin:
+                    fp.close()
+            print(f"Imported: {summary['inserted']} inserted, {summary['updated']} updated, "
+                  f"{summary['unchanged']} unchanged, {summary['rejected']} rejected")
+            for error in summary["errors"]:
+                print(f"  rejected {error}")
+        else:
+            out = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8")
+            try:
+                for text in export_products(conn):
+                    out.write(text)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+    except ValueError as e:
+        sys.exit(f"Import failed: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Opt-in sampling profiler for slow requests.
+
+Set PROFILE_SLOW_REQUESTS_MS to turn it on. One background thread then
+samples the stacks of threads that are handling a request every
+PROFILE_INTERVAL_MS. When a request turns out slower than the threshold,
+its most common stacks are printed to the log; faster requests are
+discarded. Off by default: the sampler thread costs some GIL time.
+"""
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+PROFILE_SLOW_REQUESTS_MS = float(os.environ.get("PROFILE_SLOW_REQUESTS_MS", 0))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 10))
+PROFILE_TOP_STACKS = int(os.environ.get("PROFILE_TOP_STACKS", 5))
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms, interval_ms=PROFILE_INTERVAL_MS, top=PROFILE_TOP_STACKS):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.top = top
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> Counter of stacks seen
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+
+    def begin(self):
+        """Start collecting samples for the current thread."""
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, label, duration):
+        """Stop sampling the current thread; report if the request was slow."""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples is None or duration < self.threshold:
+            return
+        total = sum(samples.values())
+        print(f"Slow request {label}: {duration * 1000:.0f}ms, {total} samples")
+        for stack, count in samples.most_common(self.top):
+            print(f"  {count / total:5.1%}  {stack}" if total else f"  {stack}")
+
+    def _sample(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == me:
+                        continue
+                    stack = traceback.extract_stack(frame)
+                    samples[" <- ".join(f"{entry.name} ({os.path.basename(entry.filename)}:{entry.lineno})"
+                                        for entry in reversed(stack[-8:]))] += 1
+
+
+def from_env():
+    """The configured profiler, or None when PROFILE_SLOW_REQUESTS_MS is unset."""
+    if PROFILE_SLOW_REQUESTS_MS <= 0:
+        return None
+    return SlowRequestProfiler(PROFILE_SLOW_REQUESTS_MS)
@@ -0,0 +1,153 @@
+import importlib
+import io
+import os
+import subprocess
+import sys
+import threading
+import traceback
+from contextlib import contextmanager
+
+# "inprocess": call the job's entry function in a warm worker thread
+# "subprocess": fork a fresh python3 per run (the old behaviour)
+RUNNER_MODE = os.environ.get("JOB_RUNNER_MODE", "inprocess")
+
+
+class _ThreadRoutedStream:
+    """
+    Stand-in for sys.stdout/sys.stderr that sends writes from a job thread
+    to that job's buffer and everything else to the real stream. Plain
+    contextlib.redirect_stdout would swap the stream for every thread,
+    so two jobs running at once would mix their output.
+    """
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def _target(self):
+        return getattr(self._local, "stream", None) or self._fallback
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+
+_install_lock = threading.Lock()
+
+
+def _install_routed_streams():
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadRoutedStream):
+            sys.stdout = _ThreadRoutedStream(sys.stdout)
+        if not isinstance(sys.stderr, _ThreadRoutedStream):
+            sys.stderr = _ThreadRoutedStream(sys.stderr)
+
+
+@contextmanager
+def capture_output(stdout, stderr=None):
+    """Send print() output from the current thread into the given streams."""
+    _install_routed_streams()
+    sys.stdout._local.stream = stdout
+    sys.stderr._local.stream = stderr if stderr is not None else stdout
+    try:
+        yield
+    finally:
+        sys.stdout._local.stream = None
+        sys.stderr._local.stream = None
+
+
+class Runner:
+    """
+    One job type: an importable entry function plus the command line used
+    when running it as a subprocess instead.
+    """
+
+    def __init__(self, module, entry, command):
+        self.module = module
+        self.entry = entry
+        self.command = command
+        self.func = None
+        self.load_error = None
+
+    def load(self):
+        """Import the entry function once. Returns False if it can't be loaded."""
+        if self.func is not None:
+            return True
+        try:
+            module = importlib.import_module(self.module)
+            self.func = getattr(module, self.entry)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if error != self.load_error:
+                print(f"Runner {self.module}.{self.entry} unavailable, "
+                      f"using subprocess: {error}")
+            self.load_error = error
+            return False
+        self.load_error = None
+        return True
+
+    def run(self, mode=None, timeout=None):
+        """
+        Run the job and return a dict with returncode, output, error and the
+        mode that was actually used. Falls back to a subprocess when the
+        entry function can't be imported.
+        """
+        mode = mode or RUNNER_MODE
+        if mode == "inprocess" and self.load():
+            return self.run_inprocess()
+        return self.run_subprocess(timeout=timeout)
+
+    def run_inprocess(self, stdout=None, stderr=None):
+        # Note: a thread can't be killed. Past JOB_TIMEOUT the JobManager
+        # marks the job timed_out, but this call keeps running (and its job
+        # type stays blocked) until it returns.
+        stdout = stdout if stdout is not None else io.StringIO()
+        stderr = stderr if stderr is not None else io.StringIO()
+        returncode = 0
+        with capture_output(stdout, stderr):
+            try:
+                self.func()
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+        return {
+            "mode": "inprocess",
+            "returncode": returncode,
+            "output": stdout.getvalue() if hasattr(stdout, "getvalue") else "",
+            "error": stderr.getvalue() if hasattr(stderr, "getvalue") else "",
+        }
+
+    def run_subprocess(self, timeout=None):
+        # TimeoutExpired is left for the caller to handle
+        result = subprocess.run(
+            self.command, capture_output=True, text=True, timeout=timeout
+        )
+        return {
+            "mode": "subprocess",
+            "returncode": result.returncode,
+            "output": result.stdout,
+            "error": result.stderr,
+        }
+
+
+RUNNERS = {
+    "scraper": Runner("walmart_scraper", "main",
+                      ["python3", "walmart_scraper.py"]),
+    "update_products": Runner("update_products", "run_once",
+                              ["python3", "update_products.py", "--once"]),
+}
+
+
+def preload(mode=None):
+    """Import every runner up front so the first trigger doesn't pay for it."""
+    if (mode or RUNNER_MODE) != "inprocess":
+        return
+    for runner in RUNNERS.values():
+        runner.load()
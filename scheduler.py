@@ -0,0 +1,250 @@
+import calendar
+import math
+import os
+import random
+import threading
+import time
+
+# Spread each run by up to this many seconds so jobs don't fire in lockstep
+SCHEDULE_JITTER = float(os.environ.get("SCHEDULE_JITTER", 30))
+# What to do with a run we woke up too late for (process paused, dyno asleep):
+# "catch_up" runs it once right away, "skip" waits for the next slot
+SCHEDULE_MISFIRE = os.environ.get("SCHEDULE_MISFIRE", "catch_up")
+# How late a run may start before it counts as missed, in seconds
+SCHEDULE_MISFIRE_GRACE = float(os.environ.get("SCHEDULE_MISFIRE_GRACE", 60))
+
+
+class IntervalTrigger:
+    """Fires every `seconds`, on a fixed grid so run times don't drift."""
+
+    def __init__(self, seconds, anchor=None):
+        if seconds <= 0:
+            raise ValueError("interval must be positive")
+        self.seconds = seconds
+        self.anchor = time.time() if anchor is None else anchor
+
+    def next_after(self, ts):
+        steps = math.floor((ts - self.anchor) / self.seconds) + 1
+        return self.anchor + max(steps, 1) * self.seconds
+
+    def __str__(self):
+        return f"interval:{self.seconds:g}"
+
+
+class CronTrigger:
+    """
+    Standard 5-field cron expression (minute hour day-of-month month
+    day-of-week), evaluated in UTC. Supports *, lists, ranges and steps.
+    """
+
+    FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31),
+              ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron needs 5 fields, got {expression!r}")
+        self.expression = expression
+        self.values = {}
+        for part, (name, low, high) in zip(parts, self.FIELDS):
+            self.values[name] = self._parse(part, low, high, name)
+        # Like cron: when both day fields are restricted, either may match
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(part, low, high, name):
+        values = set()
+        for item in part.split(","):
+            spec, _, step = item.partition("/")
+            step = int(step) if step else 1
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(x) for x in spec.split("-", 1))
+            else:
+                start = int(spec)
+                end = high if step > 1 else start
+            if not (low <= start <= end <= high) or step < 1:
+                raise ValueError(f"bad cron {name} field {part!r}")
+            values.update(range(start, end + 1, step))
+        if name == "weekday":
+            values = {value % 7 for value in values}  # 7 is Sunday too
+        return values
+
+    def _day_matches(self, t):
+        day_ok = t.tm_mday in self.values["day"]
+        # time.struct_time counts Monday as 0, cron counts Sunday as 0
+        weekday_ok = (t.tm_wday + 1) % 7 in self.values["weekday"]
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, ts):
+        ts = (int(ts) // 60 + 1) * 60  # next whole minute
+        limit = ts + 5 * 366 * 86400
+        while ts < limit:
+            t = time.gmtime(ts)
+            if t.tm_mon not in self.values["month"]:
+                # jump to the first minute of next month
+                year, month = (t.tm_year + 1, 1) if t.tm_mon == 12 else (t.tm_year, t.tm_mon + 1)
+                ts = calendar.timegm((year, month, 1, 0, 0, 0))
+            elif not self._day_matches(t):
+                ts = calendar.timegm((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0)) + 86400
+            elif t.tm_hour not in self.values["hour"]:
+                ts = calendar.timegm((t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, 0, 0)) + 3600
+            elif t.tm_min not in self.values["minute"]:
+                ts += 60
+            else:
+                return float(ts)
+        raise ValueError(f"cron {self.expression!r} never fires")
+
+    def __str__(self):
+        return f"cron:{self.expression}"
+
+
+def parse_trigger(spec):
+    """
+    Turn "interval:600" or "cron:*/10 * * * *" into a trigger. Returns None
+    for "off" or an empty spec.
+    """
+    spec = (spec or "").strip()
+    if spec.lower() in ("", "off", "none", "disabled"):
+        return None
+    kind, _, value = spec.partition(":")
+    if kind == "interval":
+        return IntervalTrigger(float(value))
+    if kind == "cron":
+        return CronTrigger(value)
+    raise ValueError(f"unknown schedule {spec!r}; use interval:<seconds> or cron:<expr>")
+
+
+class Scheduler:
+    """
+    Fires job types on their triggers through a JobManager. One thread
+    sleeps until the next run is due (or until stop() wakes it), rather
+    than polling. The JobManager already refuses a second copy of a job
+    type that is still queued or running, so a slow run is never
+    overlapped: the overlapping trigger is recorded as skipped.
+    """
+
+    def __init__(self, jobs, jitter=SCHEDULE_JITTER, misfire=SCHEDULE_MISFIRE,
+                 misfire_grace=SCHEDULE_MISFIRE_GRACE):
+        if misfire not in ("catch_up", "skip"):
+            raise ValueError(f"misfire policy must be catch_up or skip, got {misfire!r}")
+        self.jobs = jobs
+        self.jitter = jitter
+        self.misfire = misfire
+        self.misfire_grace = misfire_grace
+        self._entries = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def add(self, job_type, trigger, run_now=False):
+        """
+        Schedule job_type on trigger. With run_now it also fires as soon as
+        the scheduler runs, then carries on from the trigger's next slot.
+        """
+        now = time.time()
+        with self._cond:
+            if run_now:
+                slot = next_run = now
+            else:
+                slot = trigger.next_after(now)
+                next_run = slot + random.uniform(0, self.jitter)
+            self._entries[job_type] = {
+                "job_type": job_type,
+                "trigger": trigger,
+                "slot": slot,
+                "next_run": next_run,
+                "last_run": None,
+                "last_job_id": None,
+                "runs": 0,
+                "overlaps_skipped": 0,
+                "misfires": 0,
+            }
+            self._cond.notify()
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def status(self):
+        with self._cond:
+            entries = [dict(entry) for entry in self._entries.values()]
+        result = []
+        for entry in sorted(entries, key=lambda e: e["next_run"]):
+            job = self.jobs.get(entry["last_job_id"]) if entry["last_job_id"] else None
+            result.append({
+                "job_type": entry["job_type"],
+                "trigger": str(entry["trigger"]),
+                "next_run": entry["next_run"],
+                "last_run": entry["last_run"],
+                "last_job_id": entry["last_job_id"],
+                "last_status": job["status"] if job else None,
+                "last_duration": job["duration"] if job else None,
+                "runs": entry["runs"],
+                "overlaps_skipped": entry["overlaps_skipped"],
+                "misfires": entry["misfires"],
+            })
+        return result
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                for entry in self._entries.values():
+                    if entry["next_run"] <= now:
+                        self._fire(entry, now)
+                if self._entries:
+                    timeout = max(0.0, min(e["next_run"] for e in self._entries.values()) - time.time())
+                else:
+                    timeout = None
+                self._cond.wait(timeout)
+
+    def _fire(self, entry, now):
+        # Caller holds the lock; JobManager.submit only queues, so this is quick
+        late = now - entry["next_run"]
+        if late > self.misfire_grace:
+            entry["misfires"] += 1
+            if self.misfire == "catch_up":
+                self._submit(entry, now)
+        else:
+            self._submit(entry, now)
+
+        slot = entry["trigger"].next_after(max(entry["slot"], now))
+        entry["slot"] = slot
+        entry["next_run"] = slot + random.uniform(0, self.jitter)
+
+    def _submit(self, entry, now):
+        try:
+            job, created = self.jobs.submit(entry["job_type"])
+        except Exception as e:
+            print(f"Scheduler could not start {entry['job_type']}: {e}")
+            return
+        entry["last_run"] = now
+        if created:
+            entry["runs"] += 1
+            entry["last_job_id"] = job["id"]
+        else:
+            entry["overlaps_skipped"] += 1
+            print(f"Scheduler skipped {entry['job_type']}: previous run still {job['status']}")
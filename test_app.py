@@ -0,0 +1,86 @@
+import os
+
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+
+import pytest  # noqa: E402
+
+import app as app_module  # noqa: E402
+import db  # noqa: E402
+from cache import TTLCache  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "products.db"))
+    app_module.product_cache.clear()
+    client = app_module.app.test_client()
+    response = client.post("/api/products/bulk", json=[
+        {"name": f"p{i}", "price": float(i), "stock": i} for i in range(1, 6)])
+    assert response.status_code == 200
+    return client
+
+
+def test_keyset_paging(client):
+    first = client.get("/api/products?limit=2").get_json()
+    second = client.get(f"/api/products?limit=2&after_id={first['next_after_id']}").get_json()
+    last = client.get(f"/api/products?limit=2&after_id={second['next_after_id']}").get_json()
+
+    names = [p["name"] for page in (first, second, last) for p in page["products"]]
+    assert names == ["p1", "p2", "p3", "p4", "p5"]
+    assert last["next_after_id"] is None
+
+
+def test_projection_and_filters(client):
+    body = client.get("/api/products?fields=name,price&min_price=2&max_stock=3").get_json()
+
+    assert body["products"] == [{"name": "p2", "price": 2.0}, {"name": "p3", "price": 3.0}]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=1001", "limit=abc", "after_id=x",
+                                   "min_price=cheap", "min_stock=1.5", "fields=name,secret"])
+def test_bad_queries_are_400(client, query):
+    response = client.get(f"/api/products?{query}")
+
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+
+def test_etag_gives_304_until_a_write(client):
+    etag = client.get("/api/products").headers["ETag"]
+
+    assert client.get("/api/products", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/api/products", json={"name": "p6", "price": 6.0})
+    response = client.get("/api/products", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()["products"]) == 6
+
+
+def test_page_read_before_a_write_is_not_cached(client, monkeypatch):
+    list_products = db.list_products
+
+    def racing_list_products(conn, **kwargs):
+        page = list_products(conn, **kwargs)
+        # A POST commits and clears the cache while this GET is still running
+        client.post("/api/products", json={"name": "p6", "price": 6.0})
+        return page
+
+    monkeypatch.setattr(db, "list_products", racing_list_products)
+    stale = client.get("/api/products")
+    monkeypatch.setattr(db, "list_products", list_products)
+
+    response = client.get("/api/products", headers={"If-None-Match": stale.headers["ETag"]})
+    assert response.status_code == 200
+    assert len(response.get_json()["products"]) == 6
+
+
+def test_cache_set_skipped_after_clear():
+    cache = TTLCache()
+    generation = cache.generation
+    cache.clear()
+
+    cache.set("key", "stale", generation)
+    assert cache.get("key") is None
+    cache.set("key", "fresh", cache.generation)
+    assert cache.get("key") == "fresh"
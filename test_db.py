@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+import db
+
+
+def make_v0_database(path, rows):
+    """A products.db as it looked before migrations: no name index, user_version 0."""
+    conn = sqlite3.connect(path)
+    conn.execute(db.SCHEMA)
+    conn.executemany("INSERT INTO product (id, name, price, stock) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_migrating_v0_database_keeps_newest_duplicate(tmp_path):
+    path = str(tmp_path / "products.db")
+    make_v0_database(path, [
+        (1, "Widget", 1.00, 5),
+        (2, "Gadget", 2.00, None),
+        (3, "Widget", 1.50, 7),
+        (4, "Widget", 1.75, 9),
+    ])
+
+    conn = db.get_connection(path)
+
+    rows = [tuple(row) for row in conn.execute("SELECT id, name, price, stock FROM product ORDER BY id")]
+    assert rows == [(2, "Gadget", 2.00, None), (4, "Widget", 1.75, 9)]
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO product (name, price) VALUES ('Widget', 3.0)")
+    assert conn.execute("SELECT COUNT(*) FROM sync_snapshot").fetchone()[0] == 0
+
+
+def test_migrate_is_a_no_op_when_up_to_date(tmp_path):
+    path = str(tmp_path / "products.db")
+    conn = db.get_connection(path)
+    conn.execute("INSERT INTO product (name, price) VALUES ('Widget', 1.0)")
+    conn.commit()
+
+    db.migrate(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM product").fetchone()[0] == 1
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+
+
+def test_upsert_counts(tmp_path):
+    conn = db.get_connection(str(tmp_path / "products.db"))
+    first = db.upsert_products(conn, [
+        {"name": "a", "price": 1.0, "stock": 1},
+        {"name": "b", "price": 2.0, "stock": None},
+    ])
+    second = db.upsert_products(conn, [
+        {"name": "a", "price": 1.0, "stock": None},  # missing stock keeps the stored one
+        {"name": "b", "price": 3.0, "stock": None},
+        {"name": "c", "price": 4.0, "stock": 2},
+    ], delete=["missing"])
+
+    assert first == {"inserted": 2, "updated": 0, "unchanged": 0, "deleted": 0}
+    assert second == {"inserted": 1, "updated": 1, "unchanged": 1, "deleted": 0}
+    assert conn.execute("SELECT stock FROM product WHERE name = 'a'").fetchone()[0] == 1
+
+
+@pytest.mark.parametrize("price", [float("nan"), float("inf"), -1, True, "1.0"])
+def test_validate_product_rejects_bad_prices(price):
+    with pytest.raises(ValueError):
+        db.validate_product({"name": "a", "price": price})
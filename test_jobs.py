@@ -0,0 +1,167 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+import metrics
+from jobs import JobManager
+
+
+class FakeRunner:
+    """Stands in for runners.Runner: returns a canned result, or blocks until released."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result or {"mode": "inprocess", "returncode": 0, "output": "ok\n", "error": ""}
+        self.error = error
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def run(self, timeout=None):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return dict(self.result)
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.005)
+
+
+def status(jobs, job_id):
+    return jobs.get(job_id)["status"]
+
+
+def test_submit_coalesces_onto_an_overdue_inprocess_job():
+    runner = FakeRunner()
+    runner.release.clear()
+    jobs = JobManager(runners={"sync": runner}, timeout=0.05)
+    job, _ = jobs.submit("sync")
+    wait_for(lambda: status(jobs, job["id"]) == "timed_out")
+
+    again, created = jobs.submit("sync")
+
+    assert not created
+    assert again["id"] == job["id"]
+    assert again["note"]
+    assert runner.calls == 1
+
+    runner.release.set()
+    wait_for(lambda: jobs.get(job["id"])["finished_at"] is not None)
+    later, created = jobs.submit("sync")
+    assert created
+    assert later["id"] != job["id"]
+    assert status(jobs, job["id"]) == "timed_out"
+
+
+def test_overdue_job_metrics_are_recorded_once_when_it_returns():
+    runner = FakeRunner()
+    runner.release.clear()
+    jobs = JobManager(runners={"slow_metrics": runner}, timeout=0.05)
+    job, _ = jobs.submit("slow_metrics")
+    wait_for(lambda: status(jobs, job["id"]) == "timed_out")
+    jobs.list()
+
+    assert metrics.JOB_OUTPUT_BYTES._values.get(("slow_metrics",)) is None
+    assert metrics.JOBS_ACTIVE._values[("slow_metrics",)] == 1
+
+    runner.release.set()
+    wait_for(lambda: jobs.get(job["id"])["finished_at"] is not None)
+
+    runs = {key: count for key, count in metrics.JOB_RUNS._values.items() if key[0] == "slow_metrics"}
+    assert runs == {("slow_metrics", "timed_out", "inprocess"): 1}
+    assert metrics.JOB_OUTPUT_BYTES._values[("slow_metrics",)]["sum"] == len("ok\n")
+    assert metrics.JOBS_ACTIVE._values[("slow_metrics",)] == 0
+
+
+def test_second_submit_coalesces_while_queued_or_running():
+    runner = FakeRunner()
+    runner.release.clear()
+    jobs = JobManager(runners={"sync": runner})
+
+    first, created = jobs.submit("sync")
+    second, created_again = jobs.submit("sync")
+
+    assert created and not created_again
+    assert second["id"] == first["id"]
+    runner.release.set()
+    wait_for(lambda: status(jobs, first["id"]) == "succeeded")
+    assert runner.calls == 1
+    assert jobs.get(first["id"])["output"] == "ok\n"
+
+
+def test_unknown_job_type():
+    jobs = JobManager(runners={})
+
+    with pytest.raises(KeyError):
+        jobs.submit("nope")
+
+
+def test_history_is_pruned_but_active_jobs_are_kept():
+    quick, slow = FakeRunner(), FakeRunner()
+    slow.release.clear()
+    jobs = JobManager(runners={"quick": quick, "slow": slow}, history=3)
+    running, _ = jobs.submit("slow")
+
+    finished = []
+    for _ in range(5):
+        job, _ = jobs.submit("quick")
+        wait_for(lambda: status(jobs, job["id"]) == "succeeded")
+        finished.append(job["id"])
+    jobs.submit("quick")  # pruning happens on submit
+
+    listed = [job["id"] for job in jobs.list()]
+    assert running["id"] in listed
+    assert len(listed) == 3
+    assert finished[0] not in listed
+    assert [job["type"] for job in jobs.list(job_type="slow")] == ["slow"]
+    slow.release.set()
+
+
+def test_late_result_does_not_overwrite_timed_out():
+    runner = FakeRunner()
+    runner.release.clear()
+    jobs = JobManager(runners={"sync": runner}, timeout=0.05)
+    job, _ = jobs.submit("sync")
+    wait_for(lambda: status(jobs, job["id"]) == "timed_out")
+
+    runner.release.set()
+    wait_for(lambda: jobs.get(job["id"])["finished_at"] is not None)
+
+    done = jobs.get(job["id"])
+    assert done["status"] == "timed_out"
+    assert done["error"].startswith("Job timed out")
+    assert done["output"] == "ok\n"
+    assert done["mode"] == "inprocess"
+
+
+def test_subprocess_timeout_maps_to_timed_out():
+    error = subprocess.TimeoutExpired(["python3", "job.py"], 1, output=b"partial\n")
+    jobs = JobManager(runners={"sync": FakeRunner(error=error)}, timeout=1)
+
+    job, _ = jobs.submit("sync")
+    wait_for(lambda: status(jobs, job["id"]) not in ("queued", "running"))
+
+    done = jobs.get(job["id"])
+    assert done["status"] == "timed_out"
+    assert done["mode"] == "subprocess"
+    assert done["output"] == "partial\n"
+
+
+def test_runner_failures():
+    jobs = JobManager(runners={
+        "exit": FakeRunner(result={"mode": "subprocess", "returncode": 2, "output": "", "error": "boom"}),
+        "raise": FakeRunner(error=RuntimeError("cannot start")),
+    })
+
+    exited, _ = jobs.submit("exit")
+    raised, _ = jobs.submit("raise")
+    wait_for(lambda: jobs.get(exited["id"])["finished_at"] and jobs.get(raised["id"])["finished_at"])
+
+    assert (status(jobs, exited["id"]), jobs.get(exited["id"])["returncode"]) == ("failed", 2)
+    assert (status(jobs, raised["id"]), jobs.get(raised["id"])["error"]) == ("failed", "cannot start")
@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+import db
+import product_io
+
+RECORDS = [
+    {"name": "Widget", "price": 1.5, "stock": 3},
+    {"name": "Bracket ] and, comma", "price": 12, "stock": None},
+    {"name": "Quote \" and \\ backslash", "price": 0.25},
+    {"name": "Ünïcödé ✓", "price": 1e3, "tags": [1, [2, 3], {"a": "]"}]},
+    {"name": "Last", "price": 123456789},
+]
+
+
+def read_all(text, on_error=None):
+    return list(product_io.iter_records(io.StringIO(text), on_error=on_error))
+
+
+@pytest.mark.parametrize("read_size", range(1, 8))
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_json_array_split_at_any_read_boundary(monkeypatch, read_size, separators):
+    monkeypatch.setattr(product_io, "READ_SIZE", read_size)
+    text = "\n  " + json.dumps(RECORDS, separators=separators, ensure_ascii=False) + "\n"
+
+    records = read_all(text)
+
+    assert records == [(f"item {i}", record) for i, record in enumerate(RECORDS, start=1)]
+
+
+@pytest.mark.parametrize("read_size", range(1, 8))
+@pytest.mark.parametrize("text, expected", [
+    ("[]", []),
+    ("[ ]", []),
+    ("[1,22,333]", [1, 22, 333]),
+    ('[-1.5e2, true, null, "x"]', [-150.0, True, None, "x"]),
+])
+def test_json_array_scalars(monkeypatch, read_size, text, expected):
+    monkeypatch.setattr(product_io, "READ_SIZE", read_size)
+
+    assert [item for _, item in read_all(text)] == expected
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 64 * 1024])
+@pytest.mark.parametrize("text", ['[{"name": "a"}', '[{"name": "a"} {"name": "b"}]', "[1,", '[{"name": '])
+def test_broken_json_array_raises(monkeypatch, read_size, text):
+    monkeypatch.setattr(product_io, "READ_SIZE", read_size)
+
+    with pytest.raises(ValueError):
+        read_all(text)
+
+
+def test_ndjson_positions_and_bad_lines():
+    errors = []
+    text = '\n{"name": "a", "price": 1}\n\nnot json\n{"name": "b", "price": 2}\n'
+
+    records = read_all(text, on_error=lambda position, error: errors.append(position))
+
+    assert records == [("line 2", {"name": "a", "price": 1}), ("line 5", {"name": "b", "price": 2})]
+    assert errors == ["line 4"]
+
+
+def test_import_skips_and_reports_bad_records(tmp_path):
+    conn = db.get_connection(str(tmp_path / "products.db"))
+    text = "\n".join(json.dumps(record) for record in [
+        {"name": "a", "price": 1.0},
+        {"price": 2.0},
+        {"name": "b", "price": -1},
+        {"name": "c", "price": 3.0, "stock": 4},
+    ])
+
+    summary = product_io.import_products(conn, io.StringIO(text), chunk_size=1)
+
+    assert (summary["inserted"], summary["rejected"]) == (2, 2)
+    assert [error.split(":")[0] for error in summary["errors"]] == ["line 2", "line 3"]
+    rows, _ = db.list_products(conn)
+    assert [row["name"] for row in rows] == ["a", "c"]
@@ -0,0 +1,233 @@
+import calendar
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import scheduler
+from scheduler import CronTrigger, IntervalTrigger, Scheduler, parse_trigger
+
+EXPRESSIONS = [
+    "* * * * *",
+    "*/15 * * * *",
+    "0 */6 * * *",
+    "30 2 * * *",
+    "5,35 9-17 * * 1-5",
+    "0 0 1 * *",
+    "0 12 * * 0",
+    "0 12 * * 7",
+    "0 0 29 2 *",       # leap days only
+    "0 0 31 * *",       # skips short months
+    "0 0 13 * 5",       # the 13th or any Friday, like cron
+    "59 23 31 12 *",
+    "10-20/5 3 * 1,6 *",
+]
+
+STARTS = [
+    calendar.timegm((2024, 1, 1, 0, 0, 0)),
+    calendar.timegm((2024, 2, 28, 23, 59, 30)),
+    calendar.timegm((2023, 12, 31, 23, 59, 59)),
+    calendar.timegm((2025, 6, 15, 12, 34, 56)),
+]
+
+
+def brute_force_next(expression, ts):
+    """Check every minute after ts, one day at a time, against each field directly."""
+    parts = expression.split()
+    minute, hour, day, month, weekday = (CronTrigger._parse(part, low, high, name)
+                                         for part, (name, low, high) in zip(parts, CronTrigger.FIELDS))
+    start = datetime.fromtimestamp((int(ts) // 60 + 1) * 60, timezone.utc)
+    date = start.replace(hour=0, minute=0)
+    while True:
+        day_ok = date.day in day
+        weekday_ok = date.isoweekday() % 7 in weekday
+        if parts[2] == "*":
+            days_ok = weekday_ok
+        elif parts[4] == "*":
+            days_ok = day_ok
+        else:
+            days_ok = day_ok or weekday_ok
+        if date.month in month and days_ok:
+            for offset in range(24 * 60):
+                candidate = date + timedelta(minutes=offset)
+                if candidate >= start and candidate.hour in hour and candidate.minute in minute:
+                    return candidate.timestamp()
+        date += timedelta(days=1)
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+@pytest.mark.parametrize("start", STARTS)
+def test_cron_next_fire_matches_minute_scan(expression, start):
+    trigger = CronTrigger(expression)
+
+    ts = start
+    for _ in range(3):
+        expected = brute_force_next(expression, ts)
+        assert trigger.next_after(ts) == expected
+        ts = expected
+
+
+def test_cron_next_fire_at_random_times():
+    rng = random.Random(7)
+    for _ in range(200):
+        expression = rng.choice(EXPRESSIONS)
+        ts = rng.uniform(calendar.timegm((2020, 1, 1, 0, 0, 0)), calendar.timegm((2030, 1, 1, 0, 0, 0)))
+        assert CronTrigger(expression).next_after(ts) == brute_force_next(expression, ts)
+
+
+def test_cron_fires_strictly_after_the_given_time():
+    ts = calendar.timegm((2024, 1, 1, 6, 0, 0))
+
+    assert CronTrigger("0 */6 * * *").next_after(ts) == ts + 6 * 3600
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "0 0 0 * *",
+                                        "0 0 * 13 *", "0 0 * * 8", "5-1 * * * *", "*/0 * * * *"])
+def test_bad_cron_expressions(expression):
+    with pytest.raises(ValueError):
+        CronTrigger(expression)
+
+
+def test_cron_that_never_fires():
+    with pytest.raises(ValueError):
+        CronTrigger("0 0 30 2 *").next_after(0)
+
+
+def test_interval_stays_on_its_grid():
+    trigger = IntervalTrigger(600, anchor=1000)
+
+    assert trigger.next_after(1000) == 1600
+    assert trigger.next_after(1599.9) == 1600
+    assert trigger.next_after(1600) == 2200
+    assert trigger.next_after(0) == 1600  # never before the anchor
+
+
+@pytest.mark.parametrize("spec", ["", None, "off", "OFF", " none ", "disabled"])
+def test_parse_trigger_off(spec):
+    assert parse_trigger(spec) is None
+
+
+def test_parse_trigger():
+    assert str(parse_trigger("interval:600")) == "interval:600"
+    assert str(parse_trigger("cron:*/10 * * * *")) == "cron:*/10 * * * *"
+    for spec in ("interval:0", "interval:abc", "every:5", "cron:* *"):
+        with pytest.raises(ValueError):
+            parse_trigger(spec)
+
+
+class FakeJobs:
+    """Stands in for JobManager: records submits, optionally as already running."""
+
+    def __init__(self):
+        self.submitted = []
+        self.running = False
+
+    def submit(self, job_type):
+        self.submitted.append(job_type)
+        job = {"id": f"job-{len(self.submitted)}", "status": "running" if self.running else "queued"}
+        return job, not self.running
+
+    def get(self, job_id):
+        return None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(scheduler.time, "time", lambda: now[0])
+    return now
+
+
+def test_run_now_fires_at_start_then_follows_the_trigger(clock):
+    jobs = FakeJobs()
+    sched = Scheduler(jobs, jitter=0)
+    sched.add("sync", IntervalTrigger(600, anchor=clock[0]), run_now=True)
+    entry = sched._entries["sync"]
+    assert entry["next_run"] == clock[0]
+
+    sched._fire(entry, clock[0])
+
+    assert jobs.submitted == ["sync"]
+    assert entry["next_run"] == clock[0] + 600
+
+
+def test_overlapping_fire_is_counted_as_skipped(clock):
+    jobs = FakeJobs()
+    sched = Scheduler(jobs, jitter=0)
+    sched.add("sync", IntervalTrigger(600, anchor=clock[0]))
+    entry = sched._entries["sync"]
+
+    clock[0] = entry["next_run"]
+    sched._fire(entry, clock[0])
+    jobs.running = True
+    clock[0] = entry["next_run"]
+    sched._fire(entry, clock[0])
+
+    assert (entry["runs"], entry["overlaps_skipped"]) == (1, 1)
+    assert entry["last_job_id"] == "job-1"
+    assert sched.status()[0]["overlaps_skipped"] == 1
+
+
+@pytest.mark.parametrize("policy, submits", [("catch_up", 1), ("skip", 0)])
+def test_misfire_past_grace(clock, policy, submits):
+    jobs = FakeJobs()
+    sched = Scheduler(jobs, jitter=0, misfire=policy, misfire_grace=60)
+    sched.add("sync", IntervalTrigger(600, anchor=clock[0]))
+    entry = sched._entries["sync"]
+    due = entry["next_run"]
+
+    clock[0] = due + 1800 + 5  # slept through several slots
+    sched._fire(entry, clock[0])
+
+    assert len(jobs.submitted) == submits
+    assert entry["misfires"] == 1
+    assert entry["next_run"] == due + 2400  # the next slot after waking, not the missed ones
+
+
+def test_late_but_within_grace_still_runs(clock):
+    jobs = FakeJobs()
+    sched = Scheduler(jobs, jitter=0, misfire="skip", misfire_grace=60)
+    sched.add("sync", IntervalTrigger(600, anchor=clock[0]))
+    entry = sched._entries["sync"]
+
+    clock[0] = entry["next_run"] + 30
+    sched._fire(entry, clock[0])
+
+    assert jobs.submitted == ["sync"]
+    assert entry["misfires"] == 0
+
+
+def test_next_run_stays_within_jitter_of_its_slot(clock):
+    anchor = clock[0]
+    sched = Scheduler(FakeJobs(), jitter=30)
+    sched.add("sync", IntervalTrigger(600, anchor=anchor))
+    entry = sched._entries["sync"]
+
+    for _ in range(200):
+        assert entry["slot"] <= entry["next_run"] <= entry["slot"] + 30
+        assert (entry["slot"] - anchor) % 600 == 0  # jitter doesn't drift the grid
+        clock[0] = entry["next_run"]
+        sched._fire(entry, clock[0])
+
+
+def test_bad_misfire_policy():
+    with pytest.raises(ValueError):
+        Scheduler(FakeJobs(), misfire="later")
+
+
+def test_start_fires_due_jobs_and_stop_joins():
+    jobs = FakeJobs()
+    sched = Scheduler(jobs, jitter=0)
+    sched.add("sync", IntervalTrigger(3600), run_now=True)
+
+    sched.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not jobs.submitted and time.monotonic() < deadline:
+            time.sleep(0.005)
+    finally:
+        sched.stop()
+
+    assert jobs.submitted == ["sync"]
+    assert not sched.running
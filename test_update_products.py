@@ -0,0 +1,80 @@
+import pytest
+
+import update_products
+
+
+@pytest.fixture
+def sync(tmp_path, monkeypatch):
+    """update_products against a temp snapshot, with the API calls faked out."""
+    monkeypatch.setattr(update_products, "SYNC_STATE_PATH", str(tmp_path / "state.db"))
+    monkeypatch.setattr(update_products, "push_product", lambda session, product: (True, None))
+    monkeypatch.setattr(update_products, "push_batch", lambda session, batch, delete=(): (True, None))
+    return update_products.update_products
+
+
+def feed(count):
+    return [{"name": f"p{i}", "price": 1.0} for i in range(count)]
+
+
+def test_empty_feed_does_not_remove_everything(sync):
+    sync(feed(20))
+
+    summary = sync([])
+
+    assert summary["deleted"] == 0
+    assert summary["held_back"] == 20
+
+
+def test_large_removal_is_held_back_until_allowed(sync):
+    sync(feed(20))
+
+    assert sync(feed(10))["held_back"] == 10
+    summary = sync(feed(10), allow_deletes=True)
+
+    assert summary["deleted"] == 10
+    assert summary["held_back"] == 0
+
+
+def test_small_removal_goes_through(sync):
+    sync(feed(20))
+
+    summary = sync(feed(19))
+
+    assert summary["deleted"] == 1
+    assert summary["unchanged"] == 19
+
+
+def test_full_resync_does_not_allow_mass_removals(sync):
+    sync(feed(20))
+
+    summary = sync([], full=True)
+
+    assert summary["deleted"] == 0
+    assert summary["held_back"] == 20
+
+
+def test_bad_records_are_skipped_and_reported(sync):
+    summary = sync([{"name": "a", "price": 1.0}, {"price": 2.0}, "junk", {"name": "b", "price": float("nan")}])
+
+    assert summary["pushed"] == 1
+    assert summary["rejected"] == 3
+
+
+def test_product_with_a_rejected_record_is_not_removed(sync):
+    sync(feed(3))
+
+    summary = sync(feed(2) + [{"name": "p2", "price": -1}])
+
+    assert summary["deleted"] == 0
+    assert summary["held_back"] == 0
+    assert summary["unchanged"] == 2
+
+
+def test_feed_file_with_bad_lines(sync, tmp_path, monkeypatch):
+    path = tmp_path / "feed.ndjson"
+    path.write_text('{"name": "a", "price": 1}\nnot json\n{"name": "b"}\n{"name": "c", "price": 3}\n')
+    monkeypatch.setattr(update_products, "SYNC_FEED_PATH", str(path))
+
+    summary = sync()
+
+    assert (summary["pushed"], summary["rejected"]) == (2, 2)
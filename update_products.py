@@ -1,9 +1,44 @@
-import requests
-import schedule
+import argparse
+import hashlib
+import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import db
+import metrics
+import product_io
 
 # Your Render API URL
-API_URL = "https://my-dashboard-tqtg.onrender.com/api/products"
+DASHBOARD_URL = os.environ.get("DASHBOARD_URL", "https://my-dashboard-tqtg.onrender.com")
+API_URL = DASHBOARD_URL.rstrip("/") + "/api/products"
+BULK_API_URL = API_URL + "/bulk"
+
+# How many requests to have in flight at once
+SYNC_CONCURRENCY = int(os.environ.get("SYNC_CONCURRENCY", 8))
+# Products per request to the bulk endpoint; 0 posts one product per request
+SYNC_BATCH_SIZE = int(os.environ.get("SYNC_BATCH_SIZE", 0))
+# Retries on connection errors and 429/5xx, with exponential backoff
+SYNC_RETRIES = int(os.environ.get("SYNC_RETRIES", 3))
+SYNC_BACKOFF = float(os.environ.get("SYNC_BACKOFF", 0.5))
+SYNC_TIMEOUT = float(os.environ.get("SYNC_TIMEOUT", 30))
+# Where we remember what was last pushed (the sync_snapshot table)
+SYNC_STATE_PATH = os.environ.get("SYNC_STATE_PATH", db.DATABASE_PATH)
+# Names per request when telling the API about removed products
+DELETE_BATCH_SIZE = 500
+# Removing more than this share of the products we have pushed before (or
+# any at all when the feed is empty) looks like a broken or truncated feed,
+# so such removals are held back unless --allow-deletes is given
+SYNC_MAX_DELETE_SHARE = float(os.environ.get("SYNC_MAX_DELETE_SHARE", 0.1))
+# Optional JSON array or NDJSON file of products to sync; without it the
+# example list below is used
+SYNC_FEED_PATH = os.environ.get("SYNC_FEED_PATH")
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
 # Example product updates
 products_to_update = [
@@ -11,23 +46,297 @@ products_to_update = [
     {"name": "Another Product", "price": 18.50}  # New price
 ]
 
-def update_products():
-    for product in products_to_update:
-        # Add or update product
-        response = requests.post(API_URL, json=product)
-        if response.status_code == 201:
-            print(f"Added/Updated product: {product['name']}")
+_session = None
+
+
+def load_feed(on_error=None):
+    """
+    The raw (position, record) pairs to sync this cycle. Lines of an NDJSON
+    feed that aren't valid JSON go to on_error(position, error).
+    """
+    if not SYNC_FEED_PATH:
+        return _positioned(products_to_update)
+    with open(SYNC_FEED_PATH, encoding="utf-8") as fp:
+        return list(product_io.iter_records(fp, on_error=on_error))
+
+
+def _positioned(products):
+    return [(f"item {i}", product) for i, product in enumerate(products, start=1)]
+
+
+def get_session():
+    """
+    Shared keep-alive session. When the dashboard runs this sync in-process
+    the session (and its open connections) carries over between cycles.
+    """
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=SYNC_RETRIES,
+            backoff_factor=SYNC_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # our POSTs are upserts, safe to repeat
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SYNC_CONCURRENCY,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def _post(session, url, payload, kind):
+    """POST to the API and time it. Returns (ok, error message)."""
+    started = time.perf_counter()
+    try:
+        response = session.post(url, json=payload, timeout=SYNC_TIMEOUT)
+    except requests.RequestException as e:
+        ok, error = False, str(e)
+    else:
+        ok = response.status_code in (200, 201)
+        error = None if ok else response.text
+    metrics.SYNC_REQUEST_SECONDS.observe(time.perf_counter() - started, kind=kind,
+                                         outcome="ok" if ok else "error")
+    return ok, error
+
+
+def push_product(session, product):
+    """Add or update one product. Returns (ok, error message)."""
+    return _post(session, API_URL, product, "product")
+
+
+def push_batch(session, batch, delete=()):
+    """
+    Add or update a list of products (and remove the named ones) in one
+    request to the bulk endpoint.
+    """
+    payload = {"products": batch, "delete": list(delete)}
+    return _post(session, BULK_API_URL, payload, "batch" if batch else "delete")
+
+
+# --- Delta tracking ---
+def product_hash(product):
+    return hashlib.sha1(json.dumps(product, sort_keys=True).encode()).hexdigest()
+
+
+def load_snapshot(conn):
+    """Return {name: hash} for everything we have pushed before."""
+    return {row["name"]: row["hash"] for row in conn.execute("SELECT name, hash FROM sync_snapshot")}
+
+
+def save_snapshot(conn, pushed, deleted):
+    """Record pushed (name, hash) pairs and forget deleted names."""
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO sync_snapshot (name, hash, pushed_at) VALUES (?, ?, ?)",
+            ((name, digest, time.time()) for name, digest in pushed),
+        )
+        conn.executemany("DELETE FROM sync_snapshot WHERE name = ?", ((name,) for name in deleted))
+
+
+def compute_delta(products, snapshot, full=False):
+    """
+    Compare the feed with the last pushed snapshot. Returns
+    (new, changed, unchanged, removed): new/changed are lists of
+    (product, hash), unchanged is a count and removed is a list of names.
+    With full=True every product counts as changed, but removals are still
+    worked out from the snapshot.
+    """
+    current = {}
+    for product in products:
+        current[product["name"]] = product  # last one wins, like the API
+
+    new, changed = [], []
+    for name, product in current.items():
+        digest = product_hash(product)
+        if name not in snapshot:
+            new.append((product, digest))
+        elif full or snapshot[name] != digest:
+            changed.append((product, digest))
+    removed = [name for name in snapshot if name not in current]
+    return new, changed, len(current) - len(new) - len(changed), removed
+
+
+def _push_changes(session, changes):
+    """Push (product, hash) pairs. Returns (pushed pairs, failed count)."""
+    if SYNC_BATCH_SIZE > 0:
+        units = [changes[i:i + SYNC_BATCH_SIZE]
+                 for i in range(0, len(changes), SYNC_BATCH_SIZE)]
+    else:
+        units = [[change] for change in changes]
+
+    pushed, failed = [], 0
+    with ThreadPoolExecutor(max_workers=SYNC_CONCURRENCY) as pool:
+        futures = {}
+        for unit in units:
+            products = [product for product, _ in unit]
+            if SYNC_BATCH_SIZE > 0:
+                futures[pool.submit(push_batch, session, products)] = unit
+            else:
+                futures[pool.submit(push_product, session, products[0])] = unit
+
+        for future in as_completed(futures):
+            unit = futures[future]
+            ok, error = future.result()
+            first = unit[0][0]["name"]
+            if ok:
+                pushed.extend((product["name"], digest) for product, digest in unit)
+                if SYNC_BATCH_SIZE > 0:
+                    print(f"Added/Updated batch of {len(unit)} products")
+                else:
+                    print(f"Added/Updated product: {first}")
+            else:
+                failed += len(unit)
+                if SYNC_BATCH_SIZE > 0:
+                    print(f"Failed to update batch of {len(unit)} (first: {first}): {error}")
+                else:
+                    print(f"Failed to update {first}: {error}")
+    return pushed, failed
+
+
+def _push_deletes(session, names):
+    """Remove products from the API. Returns (deleted names, failed count)."""
+    deleted, failed = [], 0
+    for i in range(0, len(names), DELETE_BATCH_SIZE):
+        chunk = names[i:i + DELETE_BATCH_SIZE]
+        ok, error = push_batch(session, [], delete=chunk)
+        if ok:
+            deleted.extend(chunk)
+            print(f"Removed {len(chunk)} products")
         else:
-            print(f"Failed to update {product['name']}: {response.text}")
+            failed += len(chunk)
+            print(f"Failed to remove {len(chunk)} products (first: {chunk[0]}): {error}")
+    return deleted, failed
+
+
+def removals_allowed(removed, snapshot_size, feed_size):
+    """Whether removing `removed` names looks like a real change, not a broken feed."""
+    if not removed:
+        return True
+    if feed_size == 0:
+        return False
+    return len(removed) <= SYNC_MAX_DELETE_SHARE * snapshot_size
+
+
+def update_products(products=None, full=False, dry_run=False, allow_deletes=False):
+    """
+    Push one cycle of product updates and print a summary. Only products
+    whose content changed since the last successful push are sent (all of
+    them with full=True), and products that left the feed are removed,
+    unless that looks like a broken feed (see SYNC_MAX_DELETE_SHARE).
+    Records that fail validation are skipped and reported; a product whose
+    record was rejected is left as it is rather than removed.
+    Requests run on a small thread pool; results are printed from this
+    thread so the job runner captures them.
+    """
+    started = time.perf_counter()
+    rejected = []
+
+    def reject(position, error):
+        rejected.append((position, error))
+
+    records = load_feed(on_error=reject) if products is None else _positioned(products)
+    products = list(product_io.validate_records(records, on_error=reject))
+    if rejected:
+        print(f"Rejected {len(rejected)} feed records:")
+        for position, error in rejected[:product_io.MAX_REPORTED_ERRORS]:
+            print(f"  {position}: {error}")
+    # A product whose record was rejected is still in the feed, just broken
+    by_position = dict(records)
+    rejected_names = set()
+    for position, _ in rejected:
+        record = by_position.get(position)
+        if isinstance(record, dict) and isinstance(record.get("name"), str):
+            rejected_names.add(record["name"].strip())
+
+    conn = db.get_connection(SYNC_STATE_PATH)
+    try:
+        snapshot = load_snapshot(conn)
+        new, changed, unchanged, removed = compute_delta(products, snapshot, full=full)
+        removed = [name for name in removed if name not in rejected_names]
+        # Share of every product we know of, in the feed or pushed before
+        known = len(new) + len(changed) + unchanged + len(removed)
+        delta = len(new) + len(changed) + len(removed)
+        share = 100.0 * delta / known if known else 0.0
+        print(f"Delta: {len(new)} new, {len(changed)} changed, {len(removed)} removed "
+              f"({delta} of {known} products, {share:.1f}%)"
+              + (" [full resync]" if full else ""))
+
+        held_back = []
+        feed_size = known - len(removed)
+        if not (allow_deletes or removals_allowed(removed, len(snapshot), feed_size)):
+            reason = "the feed is empty" if feed_size == 0 else (
+                f"that is more than {SYNC_MAX_DELETE_SHARE:.0%} of what was pushed")
+            print(f"Refusing to remove {len(removed)} of {len(snapshot)} products: {reason}. "
+                  "Rerun with --allow-deletes if this is intended.")
+            held_back, removed = removed, []
+
+        if dry_run:
+            print("Dry run: nothing pushed")
+            pushed, deleted, failed = [], [], 0
+        else:
+            session = get_session()
+            pushed, failed = _push_changes(session, new + changed)
+            deleted, delete_failed = _push_deletes(session, removed)
+            failed += delete_failed
+            save_snapshot(conn, pushed, deleted)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    if not dry_run:
+        metrics.SYNC_CYCLE_SECONDS.observe(elapsed)
+        for result, count in (("pushed", len(pushed)), ("deleted", len(deleted)),
+                              ("failed", failed), ("unchanged", unchanged),
+                              ("held_back", len(held_back)), ("rejected", len(rejected))):
+            metrics.SYNC_PRODUCTS.inc(count, result=result)
+    summary = {
+        "pushed": len(pushed),
+        "deleted": len(deleted),
+        "failed": failed,
+        "unchanged": unchanged,
+        "held_back": len(held_back),
+        "rejected": len(rejected),
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(pushed) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    print(f"Sync cycle done: {summary['pushed']} pushed, {summary['deleted']} removed, "
+          f"{summary['unchanged']} unchanged, {summary['held_back']} held back, "
+          f"{summary['rejected']} rejected, {failed} failed in "
+          f"{summary['seconds']}s ({summary['per_second']} products/s)")
+    return summary
+
+
+def run_once(full=False, allow_deletes=False):
+    """
+    Entry point for the dashboard's job runner: one sync cycle, no scheduling.
+    """
+    summary = update_products(full=full, allow_deletes=allow_deletes)
+    if summary["failed"]:
+        raise SystemExit(1)
+
 
-# Schedule updates every 10 minutes
-schedule.every(10).minutes.do(update_products)
+def main(argv=None):
+    """
+    Run one sync cycle. Repeating it every 10 minutes is the dashboard
+    app's job now (see scheduler.py), so this no longer loops.
+    """
+    parser = argparse.ArgumentParser(description="Push product price/stock updates to the dashboard API.")
+    parser.add_argument("--once", action="store_true", help="accepted for compatibility; every run is a single cycle")
+    parser.add_argument("--full", action="store_true", help="push every product, not just the ones that changed")
+    parser.add_argument("--dry-run", action="store_true", help="show the delta without pushing anything")
+    parser.add_argument("--allow-deletes", action="store_true",
+                        help="remove products that left the feed even if the feed looks empty or truncated")
+    args = parser.parse_args(argv)
 
-print("Auto-update script running...")
-update_products()  # Run immediately on start
+    if args.dry_run:
+        update_products(full=args.full, dry_run=True, allow_deletes=args.allow_deletes)
+        return
+    run_once(full=args.full, allow_deletes=args.allow_deletes)
 
-# Keep script running
-while True:
-    schedule.run_pending()
-    time.sleep(1)
 
+if __name__ == '__main__':
+    main()